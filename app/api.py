@@ -1,18 +1,33 @@
 """ API classes """
-from rest_framework import generics
+from django.db.models import Prefetch
+from rest_framework import generics, mixins, status
 from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 
-from app.serializers import PageSerializer, PageDetailSerializer  # , ContentDetailSerializer
-from app.service import ContentType, Pagination
-from app.models import Page  # , Content
+from app.serializers import PageSerializer, PageDetailSerializer, UploadSerializer, PAGE_FIELDS, CONTENT_RELATIONS
+from app.leaderboard import leaderboard, PAGES, CONTENT, ALL_TIME, WINDOWS, TOP_K
+from app.service import ContentType, Pagination, increase_counters
+from app.models import Page, Content, Text, Audio, Video, Upload
+from app.uploads import UploadError, append_chunk, commit_upload, discard_upload
+
+# ----- Constants
+PAGE_COLUMNS = ('title', 'content_list')                            # поля страницы - столбцы таблицы
+SPARSE_ACTIONS = ('list', 'retrieve')                               # действия с ограничением полей и связей
+UPLOAD_OFFSET_HEADER = 'HTTP_UPLOAD_OFFSET'                         # заголовок Upload-Offset: смещение части файла
+CONTENT_MODELS = {ContentType.TEXT: Text, ContentType.AUDIO: Audio, ContentType.VIDEO: Video}
 
 
 class PageModelViewSet(viewsets.ModelViewSet):
     """ АPI модели Page.
         Класс ModelViewSet Наследуется от класса GenericAPIView и включает реализации api-методов: .list(), .retrieve(), .create(), .update(), .partial_update(), .destroy()
-
+        Параметры запроса (через запятую):
+            fields -- поля страницы в ответе, например ?fields=id,title;
+            expand -- раскрываемые связи, например ?expand=content,content.text (детализация - все связи).
+        Поля и связи ограничивают и выборку из БД: столбцы страницы и запросы связанных объектов.
     """
     queryset = Page.objects.all()
     # serializer_class = PageSerializer
@@ -27,24 +42,155 @@ class PageModelViewSet(viewsets.ModelViewSet):
             return PageDetailSerializer
         return PageSerializer
 
+    def get_query_list(self, param):
+        """ Возвращает список значений параметра запроса через запятую либо None при отсутствии параметра. """
+        value = self.request.query_params.get(param) if self.request else None
+        if value is None:
+            return None
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    def get_fields(self):
+        """ Возвращает запрошенные поля страницы (по умолчанию - все). """
+        fields = [name for name in self.get_query_list('fields') or () if name in PAGE_FIELDS]
+        return fields or list(PAGE_FIELDS)
+
+    def get_expand(self):
+        """ Возвращает запрошенные раскрываемые связи (по умолчанию - связи сериализатора действия). """
+        expand = self.get_query_list('expand')
+        return self.get_serializer_class().default_expand if expand is None else expand
+
+    def get_serializer(self, *args, **kwargs):
+        """ Переопределение стандартного метода. Передача сериализатору полей и связей из запроса. """
+        if self.action in SPARSE_ACTIONS:
+            kwargs.setdefault('fields', self.get_fields())
+            kwargs.setdefault('expand', self.get_expand())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        """ Переопределение стандартного метода.
+            Выборка только запрошенных столбцов страницы и предвыборка контента только при его запросе.
+        """
+        queryset = super().get_queryset()
+        if self.action not in SPARSE_ACTIONS:
+            return queryset
+        fields, expand = self.get_fields(), self.get_expand()
+        queryset = queryset.only('id', *[name for name in PAGE_COLUMNS if name in fields])
+        if 'content' in fields:
+            if 'content' in expand:
+                related = [name for name in CONTENT_RELATIONS if 'content.' + name in expand]
+                content = Content.objects.select_related(*related)
+            else:
+                content = Content.objects.only('id')                  # только id связанного контента
+            queryset = queryset.prefetch_related(Prefetch('content', queryset=content))
+        return queryset
+
+    def get_viewed_content(self, instance):
+        """ Возвращает ключи (тип контента, id объекта по типу) непустого контента страницы для подсчёта просмотров.
+            Использует предвыборку контента при его раскрытии, иначе - один запрос типов и id связей.
+            Контент без связи по типу (связь снята либо связанный объект удалён) не учитывается.
+        """
+        if 'content' in self.get_fields() and 'content' in self.get_expand():
+            rows = [(obj.ctype, *(getattr(obj, name + '_id') for name in CONTENT_RELATIONS))
+                    for obj in instance.content.all() if obj.not_empty]
+        else:
+            rows = Content.objects.filter(page=instance, not_empty=True) \
+                .values_list('ctype', *(name + '_id' for name in CONTENT_RELATIONS))
+        viewed = []
+        for ctype, *ids in rows:
+            obj_id = dict(zip(CONTENT_RELATIONS, ids)).get(ContentType.CTYPE_DICT.get(ctype))
+            if obj_id is not None:
+                viewed.append((ctype, obj_id))
+        return viewed
+
     def retrieve(self, request, *args, **kwargs):
         """ Переопределение страндартного метода.
-            Вызов метода модели при обработке API-запроса.
+            Увеличение счётчиков просмотров контента страницы при обработке API-запроса.
         """
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        # Увеличение счётчика просмотров
-        contents = instance.content.all()
-        if contents:
-            for obj in contents:
-                if obj.not_empty:
-                    ctype = obj.ctype
-                    # вызов метода модели контента по типу
-                    if ctype == ContentType.TEXT:
-                        obj.text.inc_counter()
-                    elif ctype == ContentType.AUDIO:
-                        obj.audio.inc_counter()
-                    elif ctype == ContentType.VIDEO:
-                        obj.video.inc_counter()
-
-        return Response(serializer.data)
+        data = self.get_serializer(instance).data                   # сериализация до изменения счётчиков
+        # Увеличение счётчиков просмотров: по одному запросу UPDATE на тип контента
+        viewed = self.get_viewed_content(instance)
+        leaderboard.load()                                          # начальный рейтинг - без текущего просмотра
+        for ctype, model in CONTENT_MODELS.items():
+            ids = [obj_id for key, obj_id in viewed if key == ctype]
+            if ids:
+                increase_counters(model, ids)
+        leaderboard.record(instance.id, viewed)                    # рейтинг просмотров
+
+        return Response(data)
+
+    @action(detail=False)
+    def top(self, request):
+        """ Рейтинг наиболее просматриваемых страниц и контента.
+            Параметры запроса: window -- окно рейтинга (all, hour, day), limit -- размер рейтинга (до TOP_K).
+        """
+        window = request.query_params.get('window', ALL_TIME)
+        if window != ALL_TIME and window not in WINDOWS:
+            raise ValidationError({'window': 'Допустимые значения: {}'.format(', '.join((ALL_TIME, ) + tuple(WINDOWS)))})
+        try:
+            limit = int(request.query_params.get('limit', TOP_K))
+        except ValueError:
+            raise ValidationError({'limit': 'Ожидается целое число.'})
+
+        top_pages = leaderboard.top(PAGES, window, limit)
+        titles = dict(Page.objects.filter(id__in=[page_id for page_id, views in top_pages]).values_list('id', 'title'))
+        return Response({
+            'window': window,
+            'pages': [
+                {'id': page_id, 'title': titles[page_id], 'views': views,
+                 'url': reverse('page-detail', args=[page_id], request=request)}
+                for page_id, views in top_pages if page_id in titles                # исключая удалённые страницы
+            ],
+            'content': [
+                {'ctype': ctype, 'id': obj_id, 'views': views}
+                for (ctype, obj_id), views in leaderboard.top(CONTENT, window, limit)
+            ],
+        })
+
+
+class UploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    """ API возобновляемой загрузки аудио- и видеофайлов частями.
+        POST   /uploads/              -- создание сессии: ctype (A, V), filename, size;
+        GET    /uploads/<id>/         -- состояние сессии, offset - позиция продолжения загрузки;
+        PATCH  /uploads/<id>/         -- часть файла в теле запроса, смещение в заголовке Upload-Offset (либо PUT);
+        POST   /uploads/<id>/commit/  -- создание объекта Audio/Video из принятого файла;
+        DELETE /uploads/<id>/         -- отмена загрузки.
+    """
+    serializer_class = UploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Upload.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+
+    def update(self, request, *args, **kwargs):
+        """ Приём части файла. Тело запроса читается из потока порциями без буферизации целиком. """
+        upload = self.get_object()
+        try:
+            offset = int(request.META[UPLOAD_OFFSET_HEADER])
+        except (KeyError, ValueError):
+            raise ValidationError({'Upload-Offset': 'Ожидается целое смещение части файла.'})
+        try:
+            upload = append_chunk(upload.id, offset, request._request)
+        except UploadError as error:
+            return Response({'detail': str(error), 'offset': upload.offset}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(upload).data)
+
+    def partial_update(self, request, *args, **kwargs):
+        return self.update(request, *args, **kwargs)
+
+    @action(detail=True, methods=['post'])
+    def commit(self, request, pk=None):
+        """ Фиксация загрузки: создание объекта медиаконтента с хэшем, вычисленным при приёме частей. """
+        upload = self.get_object()
+        try:
+            obj = commit_upload(upload)
+        except UploadError as error:
+            return Response({'detail': str(error), 'offset': upload.offset}, status=status.HTTP_409_CONFLICT)
+        return Response({'ctype': upload.ctype, 'id': obj.id, 'hash': obj.hash}, status=status.HTTP_201_CREATED)
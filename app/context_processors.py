@@ -0,0 +1,9 @@
+""" Context Processors. """
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+
+def static_version(request):
+    """ Версия статических файлов - часть ключей кэшируемых фрагментов шаблонов со ссылками на статику. """
+    return {'static_version': settings.STATIC_URL + getattr(staticfiles_storage, 'manifest_version', '')}
@@ -0,0 +1,234 @@
+""" Рейтинг наиболее просматриваемых страниц и контента (top-K).
+
+    Рейтинг поддерживается инкрементально при подсчёте просмотров (PageModelViewSet.retrieve) в памяти процесса
+    сводками Space-Saving ограниченной ёмкости: чтение top-K не зависит от объёма контента в БД.
+    Накопленные приращения сливаются в общий снимок в БД (LeaderboardSnapshot) не позднее PERSIST_INTERVAL
+    после первого несохранённого просмотра - в фоновом потоке, независимо от последующих запросов.
+    При слиянии процесс получает и просмотры, учтённые другими процессами.
+"""
+
+import heapq
+import time
+from operator import itemgetter
+from threading import Lock, RLock, Timer
+
+from django.db import DatabaseError, connection, transaction
+
+from app.models import LeaderboardSnapshot, Text, Audio, Video
+from app.service import ContentType
+
+# ----- Constants
+TOP_K = 10                                          # максимальный размер рейтинга
+CAPACITY = TOP_K * 10                               # ёмкость сводки (запас для точности top-K)
+PERSIST_INTERVAL = 60                               # интервал слияния со снимком в БД, сек
+SNAPSHOT_NAME = 'views'                             # имя снимка рейтингов в БД
+PAGES, CONTENT = 'pages', 'content'                 # виды рейтингов
+ALL_TIME = 'all'                                    # окно "за всё время"
+# Скользящие окна: имя -> (длительность в секундах, количество корзин)
+WINDOWS = {
+    'hour': (3600, 60),
+    'day': (86400, 24),
+}
+
+
+class Summary:
+    """ Сводка Space-Saving: приближённые счётчики наиболее частых ключей в памяти O(capacity). """
+
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, key, count=1, now=None):
+        counts = self.counts
+        if key in counts:
+            counts[key] += count
+        elif len(counts) < self.capacity:
+            counts[key] = count
+        else:
+            # вытеснение наименьшего счётчика с наследованием его значения (оценка сверху)
+            victim = min(counts, key=counts.get)
+            counts[key] = counts.pop(victim) + count
+
+    def merge(self, other):
+        for key, count in other.counts.items():
+            self.add(key, count)
+
+    def top(self, k, now=None):
+        return heapq.nlargest(k, self.counts.items(), key=itemgetter(1))
+
+    def dump(self):
+        """ Представление для JSON: список [ключ, счётчик] (ключ контента - список [тип, id]). """
+        return [[key, count] for key, count in self.counts.items()]
+
+    def restore(self, data):
+        self.counts = {tuple(key) if isinstance(key, list) else key: count for key, count in data}
+        return self
+
+
+class WindowedSummary:
+    """ Сводки скользящего окна по временным корзинам: устаревшие корзины отбрасываются целиком. """
+
+    def __init__(self, duration, buckets, capacity=CAPACITY):
+        self.width = duration / buckets
+        self.size = buckets
+        self.capacity = capacity
+        self.buckets = {}                                           # номер корзины -> Summary
+
+    def prune(self, now):
+        oldest = int(now // self.width) - self.size
+        for index in [index for index in self.buckets if index <= oldest]:
+            del self.buckets[index]
+
+    def add(self, key, count=1, now=None):
+        index = int((now or time.time()) // self.width)
+        self.buckets.setdefault(index, Summary(self.capacity)).add(key, count)
+
+    def merge(self, other):
+        for index, summary in other.buckets.items():
+            self.buckets.setdefault(index, Summary(self.capacity)).merge(summary)
+
+    def top(self, k, now=None):
+        self.prune(now or time.time())
+        total = Summary(self.capacity * self.size)
+        for summary in self.buckets.values():
+            total.merge(summary)
+        return total.top(k)
+
+    def dump(self):
+        """ Представление для JSON: список [номер корзины, сводка корзины]. """
+        return [[index, summary.dump()] for index, summary in self.buckets.items()]
+
+    def restore(self, data):
+        self.buckets = {index: Summary(self.capacity).restore(items) for index, items in data}
+        return self
+
+
+def new_boards():
+    """ Возвращает пустые рейтинги страниц и контента по всем окнам. """
+    boards = {}
+    for kind in (PAGES, CONTENT):
+        boards[kind] = {ALL_TIME: Summary()}
+        boards[kind].update({name: WindowedSummary(*params) for name, params in WINDOWS.items()})
+    return boards
+
+
+def merge_boards(target, source):
+    for kind, windows in source.items():
+        for window, summary in windows.items():
+            target[kind][window].merge(summary)
+
+
+def dump_boards(boards):
+    """ Представление рейтингов для хранения в JSON-поле снимка. """
+    return {kind: {window: summary.dump() for window, summary in windows.items()} for kind, windows in boards.items()}
+
+
+def restore_boards(data):
+    """ Восстанавливает рейтинги из снимка (окна, отсутствующие в WINDOWS, отбрасываются). """
+    boards = new_boards()
+    for kind, windows in data.items():
+        for window, items in windows.items():
+            if window in boards.get(kind, {}):
+                boards[kind][window].restore(items)
+    return boards
+
+
+def seed_boards():
+    """ Начальный рейтинг контента за всё время по счётчикам просмотров в БД (при создании снимка). """
+    boards = new_boards()
+    for ctype, model in ((ContentType.TEXT, Text), (ContentType.AUDIO, Audio), (ContentType.VIDEO, Video)):
+        rows = model.objects.filter(counter__gt=0).order_by('-counter').values_list('id', 'counter')[:CAPACITY]
+        for obj_id, counter in rows:
+            boards[CONTENT][ALL_TIME].add((ctype, obj_id), counter)
+    return boards
+
+
+class Leaderboard:
+    """ Рейтинги просмотров процесса: общий вид (снимок + приращения) и несохранённые приращения. """
+
+    def __init__(self):
+        self.lock = RLock()                                         # load() вызывается и под блокировкой
+        self.persist_lock = Lock()                                  # одно слияние со снимком в процессе
+        self.boards = None                                          # загружается при первом обращении
+        self.deltas = new_boards()
+        self.timer = None                                           # отложенное слияние приращений
+
+    def load(self):
+        """ Загрузка общего снимка. Снимок создаётся однократно с начальным рейтингом по счётчикам в БД:
+            до его создания ни один процесс не накапливает приращений, поэтому просмотры не учитываются дважды.
+            При подсчёте просмотров вызывается до увеличения счётчиков, чтобы текущий просмотр не вошёл
+            в начальный рейтинг.
+        """
+        with self.lock:
+            if self.boards is None:
+                snapshot = LeaderboardSnapshot.objects.filter(name=SNAPSHOT_NAME).first()
+                if snapshot is None:
+                    snapshot, created = LeaderboardSnapshot.objects.get_or_create(
+                        name=SNAPSHOT_NAME, defaults={'data': dump_boards(seed_boards())})
+                self.boards = restore_boards(snapshot.data)
+
+    def schedule(self):
+        """ Планирование слияния приращений через PERSIST_INTERVAL (вызывается под self.lock). """
+        if self.timer is None:
+            self.timer = Timer(PERSIST_INTERVAL, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def record(self, page_id, content_keys):
+        """ Учёт просмотра страницы и её контента (ключи: (тип контента, id объекта по типу)). """
+        now = time.time()
+        with self.lock:
+            self.load()
+            for boards in (self.boards, self.deltas):
+                for window in boards[PAGES].values():
+                    window.add(page_id, 1, now)
+                for key in content_keys:
+                    for window in boards[CONTENT].values():
+                        window.add(key, 1, now)
+            self.schedule()
+
+    def flush(self):
+        """ Слияние приращений в фоновом потоке с закрытием его соединения с БД. """
+        try:
+            self.persist()
+        finally:
+            connection.close()
+
+    def persist(self):
+        """ Слияние приращений процесса с общим снимком в БД под блокировкой строки снимка
+            и обновление общего вида. При ошибке БД приращения сохраняются до следующего слияния.
+        """
+        with self.persist_lock:
+            with self.lock:
+                self.load()
+                deltas, self.deltas, self.timer = self.deltas, new_boards(), None
+            try:
+                with transaction.atomic():
+                    row, created = LeaderboardSnapshot.objects.select_for_update().get_or_create(
+                        name=SNAPSHOT_NAME, defaults={'data': dump_boards(new_boards())})
+                    snapshot = restore_boards(row.data)
+                    merge_boards(snapshot, deltas)
+                    for windows in snapshot.values():
+                        for summary in windows.values():
+                            if isinstance(summary, WindowedSummary):
+                                summary.prune(time.time())
+                    row.data = dump_boards(snapshot)
+                    row.save(update_fields=['data', 'updated'])
+            except DatabaseError:
+                with self.lock:
+                    merge_boards(self.deltas, deltas)
+                    self.schedule()
+                return False
+            with self.lock:
+                merge_boards(snapshot, self.deltas)                 # приращения, учтённые во время слияния
+                self.boards = snapshot
+            return True
+
+    def top(self, kind, window=ALL_TIME, k=TOP_K):
+        """ Возвращает список (ключ, просмотры) top-k рейтинга вида kind за окно window. """
+        with self.lock:
+            self.load()
+            return self.boards[kind][window].top(min(k, TOP_K))
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,62 @@
+""" Замер формирования стартовой страницы: время и объём выделенной памяти на запрос, число запросов к БД. """
+
+import time
+import tracemalloc
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from app.views import HomePageView
+
+# ----- Constants
+REQUESTS = 500                                      # количество запросов для замера времени
+ALLOC_REQUESTS = 50                                 # количество запросов для замера памяти (tracemalloc замедляет)
+KB = 1024
+
+
+class Command(BaseCommand):
+    help = 'Замер формирования стартовой страницы на текущей БД: мс и КБ выделенной памяти на запрос, запросы к БД.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=REQUESTS, help='Количество запросов')
+        parser.add_argument('--cold', action='store_true',
+                            help='Очистка кэша перед каждым запросом (без кэшированных фрагментов)')
+
+    def handle(self, *args, **options):
+        self.cold = options['cold']
+        self.request_factory = RequestFactory(HTTP_HOST='localhost')
+        self.view = HomePageView.as_view()
+        self.render()                                           # прогрев: загрузка шаблонов, заполнение кэша
+
+        count = options['requests']
+        started = time.perf_counter()
+        for _ in range(count):
+            content = self.render()
+        elapsed = (time.perf_counter() - started) / count * 1000
+
+        peaks = []
+        tracemalloc.start()
+        for _ in range(ALLOC_REQUESTS):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            self.render()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        tracemalloc.stop()
+
+        with CaptureQueriesContext(connection) as context:
+            self.render()
+        self.stdout.write('{}: {:.2f} мс/запрос, память {:.1f} КБ/запрос, запросов к БД - {}, ответ {} байт'.format(
+            'Без кэша' if self.cold else 'С кэшем', elapsed, sum(peaks) / len(peaks) / KB,
+            len(context.captured_queries), len(content)))
+
+    def render(self):
+        """ Формирование стартовой страницы без HTTP-слоя. Возвращает содержимое ответа. """
+        if self.cold:
+            cache.clear()
+        request = self.request_factory.get('/')
+        request.user = AnonymousUser()
+        return self.view(request).render().content
@@ -0,0 +1,161 @@
+""" Очистка хранилища медиаконтента от файлов, на которые нет ссылок в БД. """
+
+import os
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.models import Audio, Video, DeferredDeletion, Upload
+from app.service import chunked
+from app.uploads import discard_upload
+
+# ----- Constants
+BATCH_SIZE = 1000                                   # размер порции файлов для проверки ссылок и удаления
+MIN_AGE = 3600                                      # минимальный возраст файла-сироты в секундах (защита загрузок)
+MEDIA_MODELS = (Audio, Video)
+
+
+def scan_files(root):
+    """ Потоковый обход дерева каталогов через os.scandir без построения полного списка файлов. """
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+def get_referenced(names):
+    """ Возвращает подмножество имён файлов, на которые ссылаются объекты медиаконтента (индексный поиск). """
+    referenced = set()
+    for model in MEDIA_MODELS:
+        for field in model.file_fields:
+            referenced.update(model.objects.filter(**{field + '__in': names}).values_list(field, flat=True))
+    return referenced
+
+
+def get_storage_names(path):
+    """ Возвращает варианты имени файла в БД: относительно MEDIA_ROOT и абсолютный путь (записи до миграции 0006). """
+    return os.path.relpath(path, settings.MEDIA_ROOT).replace(os.path.sep, '/'), path
+
+
+def get_upload_id(name):
+    """ Возвращает id загрузки по имени временного файла либо None для постороннего файла. """
+    try:
+        return uuid.UUID(name)
+    except ValueError:
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Удаление файлов медиаконтента без ссылок в БД: очередь отложенного удаления и обход MEDIA_ROOT, ' \
+           'а также истёкших загрузок частями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Только отчёт, без удаления файлов')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Размер порции файлов')
+        parser.add_argument('--rate', type=float, default=0,
+                            help='Максимум удалений файлов в секунду (0 - без ограничения)')
+        parser.add_argument('--min-age', type=int, default=MIN_AGE,
+                            help='Минимальный возраст файла при обходе каталогов, сек')
+        parser.add_argument('--upload-expire', type=int, default=settings.UPLOAD_EXPIRE,
+                            help='Срок незавершённой загрузки частями без новых частей, сек')
+        parser.add_argument('--queue-only', action='store_true',
+                            help='Только обработка очереди, без обхода и удаления истёкших загрузок')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.rate = options['rate']
+        batch_size = options['batch_size']
+
+        deleted = self.drain_queue(batch_size)
+        self.stdout.write('Очередь: удалено файлов - {}'.format(deleted))
+        if not options['queue_only']:
+            deleted = self.sweep(batch_size, options['min_age'])
+            self.stdout.write('Обход: удалено файлов-сирот - {}'.format(deleted))
+            sessions, files = self.expire_uploads(options['upload_expire'])
+            self.stdout.write('Загрузки: удалено истёкших сессий - {}, временных файлов без сессий - {}'.format(
+                sessions, files))
+        if self.dry_run:
+            self.stdout.write('Режим --dry-run: файлы не удалялись.')
+
+    def drain_queue(self, batch_size):
+        """ Обработка очереди отложенного удаления. Файлы, на которые снова есть ссылки, сохраняются. """
+        deleted, last_id = 0, 0
+        queue = DeferredDeletion.objects.order_by('id').values_list('id', 'path')
+        batch = list(queue.filter(id__gt=last_id)[:batch_size])     # постраничная выборка по ключу
+        while batch:
+            ids, names = zip(*batch)
+            referenced = get_referenced(names)
+            deleted += self.delete_files([name for name in names if name not in referenced])
+            if not self.dry_run:
+                DeferredDeletion.objects.filter(id__in=ids).delete()
+            last_id = ids[-1]
+            batch = list(queue.filter(id__gt=last_id)[:batch_size])
+        return deleted
+
+    def sweep(self, batch_size, min_age):
+        """ Потоковый обход MEDIA_ROOT (включая каталог SUBTITLES) и удаление файлов-сирот порциями. """
+        deleted = 0
+        threshold = time.time() - min_age
+        entries = (entry for entry in scan_files(settings.MEDIA_ROOT) if entry.stat().st_mtime < threshold)
+        for batch in chunked(entries, batch_size):
+            names = [get_storage_names(entry.path) for entry in batch]
+            referenced = get_referenced([name for pair in names for name in pair])
+            orphans = [relative for relative, absolute in names
+                       if relative not in referenced and absolute not in referenced]
+            deleted += self.delete_files(orphans)
+        return deleted
+
+    def delete_files(self, names):
+        """ Удаление порции файлов из хранилища с ограничением скорости. Возвращает количество файлов. """
+        started = time.monotonic()
+        for name in names:
+            if self.verbosity > 1:
+                self.stdout.write('  удаление: {}'.format(name))
+            if not self.dry_run:
+                default_storage.delete(name)
+        if self.rate and names and not self.dry_run:
+            pause = len(names) / self.rate - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+        return len(names)
+
+    def expire_uploads(self, expire):
+        """ Удаление сессий загрузки без новых частей дольше expire секунд и временных файлов без сессий.
+            Возвращает количество удалённых сессий и файлов.
+        """
+        threshold = timezone.now() - timedelta(seconds=expire)
+        expired = Upload.objects.filter(updated__lt=threshold)
+        sessions = expired.count()
+        if not self.dry_run:
+            for upload in expired.iterator():
+                discard_upload(upload)
+        try:
+            with os.scandir(settings.UPLOADS_DIR) as entries:
+                old = [entry for entry in entries
+                       if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < threshold.timestamp()]
+        except FileNotFoundError:
+            return sessions, 0
+        upload_ids = {entry.name: get_upload_id(entry.name) for entry in old}
+        live = set(Upload.objects.filter(id__in=[upload_id for upload_id in upload_ids.values() if upload_id])
+                   .values_list('id', flat=True))
+        orphans = [entry for entry in old if upload_ids[entry.name] not in live]
+        for entry in orphans:
+            if self.verbosity > 1:
+                self.stdout.write('  удаление: {}'.format(entry.path))
+            if not self.dry_run:
+                os.remove(entry.path)
+        return sessions, len(orphans)
@@ -0,0 +1,170 @@
+""" Проверка целостности контента: сверка хэшей файлов и текстов с сохранёнными в БД. """
+
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import Text, Audio, Video
+from app.service import HASH_CHUNK_SIZE, get_hash
+
+# ----- Constants
+BATCH_SIZE = 256                                    # порция объектов между сохранениями контрольной точки
+CHECKPOINT = os.path.join(settings.BASE_DIR, 'verify_media.json')
+MODELS = (Text, Audio, Video)
+MB = 1048576
+# Ошибки проверки объекта
+MISMATCH, MISSING, UNREADABLE = 'mismatch', 'missing', 'unreadable'
+
+
+class Throttle:
+    """ Общее для потоков ограничение скорости чтения, байт в секунду (0 - без ограничения). """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.lock = Lock()
+        self.next_time = time.monotonic()
+
+    def consume(self, size):
+        """ Ожидание, пока прочитанный объём данных не уложится в заданную скорость. """
+        if not self.rate:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.next_time = max(self.next_time, now) + size / self.rate
+            delay = self.next_time - now
+        time.sleep(delay)
+
+
+def hash_file(name, throttle):
+    """ Возвращает MD5 файла хранилища, читая его порциями с ограничением скорости. """
+    md5hash = hashlib.md5()
+    with default_storage.open(name, 'rb') as file:
+        for data in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            md5hash.update(data)
+            throttle.consume(len(data))
+    return md5hash.hexdigest()
+
+
+def verify_text(row, throttle):
+    """ Проверяет хэш текста (id, hash, value). Возвращает описание ошибки либо None. """
+    obj_id, stored, value = row
+    actual = get_hash('', value)
+    if actual != stored:
+        return {'id': obj_id, 'error': MISMATCH, 'stored': stored, 'actual': actual}
+    return None
+
+
+def verify_file(row, throttle):
+    """ Проверяет хэш файла (id, hash, имя файла). Возвращает описание ошибки либо None. """
+    obj_id, stored, name = row
+    try:
+        actual = hash_file(name, throttle)
+    except FileNotFoundError:
+        return {'id': obj_id, 'error': MISSING, 'file': name}
+    except (OSError, SuspiciousFileOperation) as error:
+        # нет прав доступа, каталог вместо файла, ошибка ввода-вывода, имя вне MEDIA_ROOT
+        return {'id': obj_id, 'error': UNREADABLE, 'file': name, 'detail': str(error)}
+    if actual != stored:
+        return {'id': obj_id, 'error': MISMATCH, 'file': name, 'stored': stored, 'actual': actual}
+    return None
+
+
+def verify_rows(executor, verify, rows, throttle, window, backlog):
+    """ Проверяет строки в пуле потоков, держа в работе не более window проверок: медленный файл не задерживает
+        проверку следующих. Генерирует (id, ошибка либо None) в порядке строк - для согласованной контрольной
+        точки; завершённых проверок, ожидающих незавершённую предыдущую, не более backlog.
+    """
+    running, pending = set(), deque()
+    for row in rows:
+        future = executor.submit(verify, row, throttle)
+        running.add(future)
+        pending.append((row[0], future))
+        if len(running) >= window:
+            running = wait(running, return_when=FIRST_COMPLETED).not_done
+        if len(pending) >= backlog:
+            wait([pending[0][1]])
+        while pending and pending[0][1].done():
+            obj_id, future = pending.popleft()
+            yield obj_id, future.result()
+    for obj_id, future in pending:
+        yield obj_id, future.result()
+
+
+class Command(BaseCommand):
+    help = 'Проверка целостности контента: повторное хэширование файлов Audio/Video и текстов Text ' \
+           'с возобновлением по контрольной точке.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='Количество потоков')
+        parser.add_argument('--rate', type=float, default=0,
+                            help='Ограничение скорости чтения файлов, МБ/с (0 - без ограничения)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Порция объектов между сохранениями контрольной точки')
+        parser.add_argument('--checkpoint', default=CHECKPOINT, help='Файл контрольной точки')
+        parser.add_argument('--resume', action='store_true', help='Продолжить проверку с контрольной точки')
+
+    def handle(self, *args, **options):
+        self.checkpoint_path = options['checkpoint']
+        state = self.load_checkpoint() if options['resume'] else {'last_id': {}, 'errors': {}}
+        throttle = Throttle(options['rate'] * MB)
+
+        workers, batch_size = options['workers'], options['batch_size']
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for model in MODELS:
+                name = model.__name__
+                verify = verify_text if model is Text else verify_file
+                last_id = state['last_id'].get(name, 0)
+                errors = state['errors'].setdefault(name, [])
+                rows = model.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'hash', 'value')
+                checked = 0
+                results = verify_rows(executor, verify, rows.iterator(chunk_size=batch_size), throttle,
+                                      workers * 2, max(batch_size, workers * 2))
+                for obj_id, error in results:
+                    if error:
+                        errors.append(error)
+                    checked += 1
+                    state['last_id'][name] = obj_id                     # все предыдущие объекты проверены
+                    if checked % batch_size == 0:
+                        self.save_checkpoint(state)
+                self.save_checkpoint(state)
+                self.stdout.write('{}: проверено {}, ошибок {}'.format(name, checked, len(errors)))
+
+        self.report(state['errors'])
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)                     # проверка завершена
+        total = sum(len(errors) for errors in state['errors'].values())
+        if total:
+            raise CommandError('Обнаружено ошибок целостности: {}'.format(total))
+
+    def report(self, errors):
+        """ Сводный отчёт об ошибках: несовпадения хэшей, отсутствующие и нечитаемые файлы. """
+        for name, items in errors.items():
+            for kind in (MISMATCH, MISSING, UNREADABLE):
+                found = [item for item in items if item['error'] == kind]
+                if found:
+                    self.stdout.write('{} [{}]: {}'.format(name, kind, len(found)))
+                    for item in found:
+                        self.stdout.write('  ' + json.dumps(item, ensure_ascii=False))
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {'last_id': {}, 'errors': {}}
+
+    def save_checkpoint(self, state):
+        """ Атомарная запись контрольной точки: id последнего проверенного объекта и найденные ошибки. """
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file, ensure_ascii=False)
+        os.replace(temp_path, self.checkpoint_path)
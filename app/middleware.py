@@ -0,0 +1,23 @@
+""" Middleware. """
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+# ----- Constants
+# Сжимаемые типы ответов: только API (JSON). HTML-страницы с CSRF-токеном не сжимаются (атака BREACH)
+GZIP_CONTENT_TYPES = ('application/json', )
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """ Согласованное (Accept-Encoding) gzip-сжатие ответов API размером от GZIP_MIN_LENGTH байт.
+        Повторное использование сжатых байт - через кэш ответов: UpdateCacheMiddleware размещается выше
+        в MIDDLEWARE и сохраняет уже сжатый вариант ответа с учётом Vary: Accept-Encoding.
+    """
+
+    def process_response(self, request, response):
+        if not response.get('Content-Type', '').startswith(GZIP_CONTENT_TYPES):
+            return response
+        # Короткие ответы не сжимаются
+        if not response.streaming and len(response.content) < settings.GZIP_MIN_LENGTH:
+            return response
+        return super().process_response(request, response)
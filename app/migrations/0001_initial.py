@@ -0,0 +1,94 @@
+# Generated by Django 3.2.4 on 2026-10-19 20:16
+#
+# Схема моделей, созданная ранее через syncdb (без миграций). Для существующей БД начальная миграция
+# отмечается применённой без создания таблиц: python manage.py migrate --fake-initial
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Audio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(editable=False, max_length=32, verbose_name='Хэш MD5')),
+                ('counter', models.PositiveIntegerField(default=0, editable=False, verbose_name='Просмотры')),
+                ('value', models.FileField(upload_to=settings.MEDIA_ROOT, verbose_name='Аудио')),
+                ('bitrate', models.PositiveIntegerField(editable=False, verbose_name='Битрейт')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Content',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ctype', models.CharField(choices=[(None, '-- Выберите --'), ('T', 'Text'), ('A', 'Audio'), ('V', 'Video')], default='', editable=False, max_length=1, verbose_name='Тип')),
+                ('title', models.CharField(max_length=256, verbose_name='Заголовок')),
+                ('not_empty', models.BooleanField(default=False, editable=False, verbose_name='Контент')),
+                ('audio', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.audio', verbose_name='Аудио')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Text',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(editable=False, max_length=32, verbose_name='Хэш MD5')),
+                ('counter', models.PositiveIntegerField(default=0, editable=False, verbose_name='Просмотры')),
+                ('value', models.TextField(verbose_name='Текст')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Video',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(editable=False, max_length=32, verbose_name='Хэш MD5')),
+                ('counter', models.PositiveIntegerField(default=0, editable=False, verbose_name='Просмотры')),
+                ('value', models.FileField(upload_to=settings.MEDIA_ROOT, verbose_name='Видео')),
+                ('subtitles', models.FileField(upload_to=settings.SUBTITLES, verbose_name='Субтитры')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Page',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=256, verbose_name='Заголовок')),
+                ('content_list', models.CharField(max_length=256, validators=[django.core.validators.RegexValidator(re.compile('^\\d+(?:,\\d+)*\\Z'), code='invalid', message='Enter only digits separated by commas.')], verbose_name='Дерево контента')),
+                ('content', models.ManyToManyField(to='app.Content', verbose_name='Объекты контента')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='text',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.text', verbose_name='Текст'),
+        ),
+        migrations.AddField(
+            model_name='content',
+            name='video',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.video', verbose_name='Видео'),
+        ),
+    ]
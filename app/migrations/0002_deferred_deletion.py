@@ -0,0 +1,37 @@
+# Generated by Django 3.2.4 on 2026-10-19 20:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeferredDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True, verbose_name='Путь файла')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Добавлен')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='audio',
+            name='value',
+            field=models.FileField(db_index=True, upload_to=settings.MEDIA_ROOT, verbose_name='Аудио'),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='subtitles',
+            field=models.FileField(db_index=True, upload_to=settings.SUBTITLES, verbose_name='Субтитры'),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='value',
+            field=models.FileField(db_index=True, upload_to=settings.MEDIA_ROOT, verbose_name='Видео'),
+        ),
+    ]
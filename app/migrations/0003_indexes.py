@@ -0,0 +1,28 @@
+# Generated by Django 3.2.4 on 2026-10-19 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_deferred_deletion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='audio',
+            name='hash',
+            field=models.CharField(db_index=True, editable=False, max_length=32, verbose_name='Хэш MD5'),
+        ),
+        migrations.AlterField(
+            model_name='text',
+            name='hash',
+            field=models.CharField(db_index=True, editable=False, max_length=32, verbose_name='Хэш MD5'),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='hash',
+            field=models.CharField(db_index=True, editable=False, max_length=32, verbose_name='Хэш MD5'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.4 on 2026-10-19 20:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_leaderboard_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='audio',
+            name='value',
+            field=models.FileField(db_index=True, upload_to='', verbose_name='Аудио'),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='subtitles',
+            field=models.FileField(db_index=True, upload_to='subtitles', verbose_name='Субтитры'),
+        ),
+        migrations.AlterField(
+            model_name='video',
+            name='value',
+            field=models.FileField(db_index=True, upload_to='', verbose_name='Видео'),
+        ),
+        migrations.AddField(
+            model_name='upload',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Последняя часть'),
+            preserve_default=False,
+        ),
+    ]
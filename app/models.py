@@ -1,5 +1,8 @@
 """ Models. """
 
+import os
+import uuid
+
 import mutagen  # рассчёт битрейта
 
 from django.conf import settings
@@ -42,7 +45,7 @@ class Properties(models.Model):
         abstract = True
 
     # Поля с автоустановкой значений (только для чтения)
-    hash = models.CharField('Хэш MD5', max_length=32, editable=False)
+    hash = models.CharField('Хэш MD5', max_length=32, editable=False, db_index=True)   # поиск дубликатов
     counter = models.PositiveIntegerField('Просмотры', default=0, editable=False)
 
 
@@ -116,9 +119,11 @@ class Text(Properties):
 
 class Audio(Properties):
     """ Модель аудиоконтента. """
-    value = models.FileField(ContentType.CTYPE_DICT_STR[ContentType.AUDIO], upload_to=settings.MEDIA_ROOT)
+    value = models.FileField(ContentType.CTYPE_DICT_STR[ContentType.AUDIO], upload_to='', db_index=True)
     bitrate = models.PositiveIntegerField('Битрейт', editable=False)
 
+    file_fields = ('value', )                                       # поля файлов (для очистки медиаконтента)
+
     @property
     def content_field_name(self):
         return ContentType.CTYPE_DICT[ContentType.AUDIO]
@@ -137,8 +142,10 @@ class Audio(Properties):
 
 class Video(Properties):
     """ Модель видеоконтента. """
-    value = models.FileField(ContentType.CTYPE_DICT_STR[ContentType.VIDEO], upload_to=settings.MEDIA_ROOT)
-    subtitles = models.FileField('Субтитры', upload_to=settings.SUBTITLES)
+    value = models.FileField(ContentType.CTYPE_DICT_STR[ContentType.VIDEO], upload_to='', db_index=True)
+    subtitles = models.FileField('Субтитры', upload_to=settings.SUBTITLES_DIR, db_index=True)
+
+    file_fields = ('value', 'subtitles')
 
     @property
     def content_field_name(self):
@@ -153,3 +160,54 @@ class Video(Properties):
 
     def __str__(self):
         return get_str_id(self) + ContentType.CTYPE_DICT_STR[ContentType.VIDEO] + '. ' + str_content(self)
+
+
+# ----- Service Models
+
+class DeferredDeletion(models.Model):
+    """ Очередь отложенного удаления файлов медиаконтента (обрабатывается командой gc_media).
+        path -- имя файла в хранилище.
+    """
+    path = models.CharField('Путь файла', max_length=255, unique=True)
+    created = models.DateTimeField('Добавлен', auto_now_add=True)
+
+    def __str__(self):
+        return get_str_id(self) + 'удаление: {}'.format(self.path)
+
+
+class Upload(models.Model):
+    """ Сессия возобновляемой загрузки файла медиаконтента частями.
+        offset -- количество принятых байт (позиция следующей части) во временном файле path.
+    """
+    CTYPE_CHOICES = (
+        (ContentType.AUDIO, 'Audio'),
+        (ContentType.VIDEO, 'Video'),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    ctype = models.CharField('Тип', max_length=1, choices=CTYPE_CHOICES)
+    filename = models.CharField('Имя файла', max_length=255)
+    size = models.PositiveBigIntegerField('Размер')
+    offset = models.PositiveBigIntegerField('Принято', default=0, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name='Пользователь', on_delete=models.CASCADE)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    updated = models.DateTimeField('Последняя часть', auto_now=True)                 # истечение сессии
+
+    @property
+    def path(self):
+        """ Путь временного файла загрузки. """
+        return os.path.join(settings.UPLOADS_DIR, str(self.id))
+
+    def __str__(self):
+        return '({}) загрузка: {} [{}/{}]'.format(self.id, str_limit(self.filename), self.offset, self.size)
+
+
+class LeaderboardSnapshot(models.Model):
+    """ Общий для процессов снимок рейтингов просмотров (app.leaderboard).
+        Процессы сливают с ним свои приращения под блокировкой строки (select_for_update).
+    """
+    name = models.CharField('Имя', max_length=32, unique=True)
+    data = models.JSONField('Рейтинги')
+    updated = models.DateTimeField('Обновлён', auto_now=True)
+
+    def __str__(self):
+        return get_str_id(self) + 'рейтинг: {}'.format(self.name)
@@ -1,11 +1,82 @@
 """ Serializers Classes. """
 
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.utils import validate_file_name
 from rest_framework import serializers
-from app.models import Page  # , Content
+from app.models import Page, Content, Text, Audio, Video, Upload
+from app.service import ContentType
 
+# ----- Constants
+PAGE_FIELDS = ('id', 'url', 'title', 'content_list', 'content')     # поля API страницы
+CONTENT_RELATIONS = tuple(ContentType.CTYPE_DICT.values())          # связи контента с объектами по типу
+# Раскрытие всех связей страницы (эквивалент depth = 2)
+EXPAND_ALL = ('content', ) + tuple('content.' + name for name in CONTENT_RELATIONS)
 
-class PageSerializer(serializers.HyperlinkedModelSerializer):
+
+class SparseFieldsMixin:
+    """ Ограничение набора полей (fields) и раскрытие связей (expand) сериализатора.
+        Раскрытие вложенных связей задаётся через точку: expand=['content', 'content.text'].
+    """
+    expandable = {}                                                 # поле связи -> сериализатор связанных объектов
+    default_expand = ()                                             # связи, раскрытые по умолчанию
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = self.default_expand if expand is None else expand
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name, serializer_class in self.expandable.items():
+            if name in expand and name in self.fields:
+                prefix = name + '.'
+                self.fields[name] = serializer_class(
+                    many=isinstance(self.fields[name], serializers.ManyRelatedField),
+                    read_only=True,
+                    expand=[item[len(prefix):] for item in expand if item.startswith(prefix)],
+                )
+
+
+class TextSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """ Сериализатор модели Text. """
+
+    class Meta:
+        model = Text
+        fields = '__all__'
+
+
+class AudioSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """ Сериализатор модели Audio. """
+
+    class Meta:
+        model = Audio
+        fields = '__all__'
+
+
+class VideoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """ Сериализатор модели Video. """
+
+    class Meta:
+        model = Video
+        fields = '__all__'
+
+
+class ContentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """ Сериализатор модели Content. Связанные объекты по типу - id либо раскрытые объекты. """
+    expandable = {
+        ContentType.CTYPE_DICT[ContentType.TEXT]: TextSerializer,
+        ContentType.CTYPE_DICT[ContentType.AUDIO]: AudioSerializer,
+        ContentType.CTYPE_DICT[ContentType.VIDEO]: VideoSerializer,
+    }
+
+    class Meta:
+        model = Content
+        fields = '__all__'
+
+
+class PageSerializer(SparseFieldsMixin, serializers.HyperlinkedModelSerializer):
     """ Сериализатор модели Page. """
+    expandable = {'content': ContentSerializer}
+
     url = serializers.HyperlinkedIdentityField(view_name="page-detail")
     content = serializers.SlugRelatedField(
         many=True,
@@ -16,15 +87,29 @@ class PageSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = Page
-        fields = ('id', 'url', 'title', 'content_list', 'content')  #
+        fields = PAGE_FIELDS
 
 
-class PageDetailSerializer(serializers.ModelSerializer):
-    """ Сериализатор модели Page. """
+class PageDetailSerializer(PageSerializer):
+    """ Сериализатор детальной информации модели Page. По умолчанию раскрыты все связи (глубина 2). """
+    default_expand = EXPAND_ALL
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    """ Сериализатор сессии загрузки файла частями. """
 
     class Meta:
-        depth = 2                                                           # глубина отображения связанных объектов
-        model = Page
-        fields = ('id', 'url', 'title', 'content_list', 'content')
+        model = Upload
+        fields = ('id', 'ctype', 'filename', 'size', 'offset', 'created')
 
-    url = serializers.HyperlinkedIdentityField(view_name="page-detail")
+    def validate_filename(self, value):
+        """ Имя файла без элементов пути: проверяется до приёма частей, а не при фиксации загрузки. """
+        try:
+            return validate_file_name(value)
+        except SuspiciousFileOperation:
+            raise serializers.ValidationError('Имя файла не должно содержать элементов пути.')
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError('Размер файла должен быть больше нуля.')
+        return value
@@ -1,6 +1,8 @@
 # ----- App Common Functions
 
 import hashlib
+from collections import Counter
+from itertools import islice
 from threading import Thread
 
 from django.db import models
@@ -106,8 +108,10 @@ def save_type_content(obj, content_model, *args, **kwargs):
     """ Переопределение метода save базовой модели контента по типу.
         Проверка уникальности объекта и перестановка на него связей с дубликатов, удаление дубликатов.
     """
-    # Вычисление хэша
-    if obj.content_field_name == ContentType.CTYPE_DICT[ContentType.TEXT]:
+    # Вычисление хэша (если не вычислен заранее, например при загрузке файла частями)
+    if getattr(obj, 'precomputed_hash', None):
+        obj.hash = obj.precomputed_hash
+    elif obj.content_field_name == ContentType.CTYPE_DICT[ContentType.TEXT]:
         obj.hash = get_hash('', obj.value)                      # текстовый хэш
     else:
         obj.hash = get_hash(obj.value)                          # файловый хэш
@@ -143,18 +147,32 @@ def get_hash_query(obj):
 
 
 def del_doubles(obj, lst):
-    """ Удаление дубликатов контента по типу. """
-    if obj.content_field_name == ContentType.CTYPE_DICT[ContentType.TEXT]:
-        for item in lst:
-            item.delete()                                           # удаление дубликатов текста
-    else:
-        for item in lst:                                            # удаление файловых объектов
-            storage, path = item.value.storage, item.value.path     # до удаления записи получаем необходимую информацию
-            storage.delete(path)                                    # удаление файла
-            item.delete()                                           # удаление объекта модели
+    """ Удаление дубликатов контента по типу.
+        Файлы дубликатов не удаляются в запросе: сигнал post_delete ставит их в очередь отложенного удаления,
+        обрабатываемую командой gc_media.
+    """
+    for item in lst:
+        item.delete()
     return
 
 
+def defer_delete(names):
+    """ Постановка файлов (имена в хранилище) в очередь отложенного удаления. """
+    from app.models import DeferredDeletion                    # отложенный импорт: app.models импортирует service
+    names = {name for name in names if name}
+    if names:
+        DeferredDeletion.objects.bulk_create([DeferredDeletion(path=name) for name in names], ignore_conflicts=True)
+
+
+def chunked(iterable, size):
+    """ Генерирует списки элементов итерируемого объекта порциями заданного размера. """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
 # ----- Функции обработки тектста
 
 def str_limit(string):
@@ -186,6 +204,17 @@ def increase_counter(obj):
     obj.save()
 
 
+def increase_counters(model, ids):
+    """ Увеличивает счётчики просмотров объектов контента по типу в БД без загрузки объектов.
+        Повторяющийся id (один объект в нескольких элементах контента страницы) учитывается каждый раз.
+    """
+    ids_by_count = {}
+    for obj_id, count in Counter(ids).items():
+        ids_by_count.setdefault(count, []).append(obj_id)
+    for count, id_list in ids_by_count.items():
+        model.objects.filter(id__in=id_list).update(counter=models.F('counter') + count)
+
+
 # ----- Обработка в потоках
 
 def threads_counter(obj):
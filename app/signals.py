@@ -0,0 +1,52 @@
+""" Signal Handlers. """
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from app.models import Page, Audio, Video
+from app.service import defer_delete
+from app.views import invalidate_home
+
+
+def get_file_names(instance):
+    """ Возвращает имена файлов объекта медиаконтента по его полям файлов. """
+    return {getattr(instance, field).name for field in instance.file_fields}
+
+
+@receiver(pre_save, sender=Audio)
+@receiver(pre_save, sender=Video)
+def remember_replaced_files(sender, instance, update_fields=None, **kwargs):
+    """ Определяет файлы, заменяемые при сохранении объекта, по сохранённой в БД записи. """
+    instance.replaced_file_names = set()
+    fields = [field for field in instance.file_fields if update_fields is None or field in update_fields]
+    if instance.pk is None or not fields:
+        return
+    stored = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    if stored:
+        current = {getattr(instance, field).name for field in fields}
+        instance.replaced_file_names = set(stored) - current
+
+
+@receiver(post_save, sender=Audio)
+@receiver(post_save, sender=Video)
+def defer_replaced_files(sender, instance, **kwargs):
+    """ Ставит в очередь удаления файлы, заменённые при сохранении объекта. """
+    replaced = getattr(instance, 'replaced_file_names', set())
+    if replaced:
+        transaction.on_commit(lambda: defer_delete(replaced))
+
+
+@receiver(post_delete, sender=Audio)
+@receiver(post_delete, sender=Video)
+def defer_deleted_files(sender, instance, **kwargs):
+    """ Ставит в очередь удаления файлы удалённого объекта. """
+    names = get_file_names(instance)
+    transaction.on_commit(lambda: defer_delete(names))
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def invalidate_home_page(sender, **kwargs):
+    """ Инвалидация кэшированных фрагментов стартовой страницы при изменении страниц. """
+    invalidate_home()
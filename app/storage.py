@@ -0,0 +1,55 @@
+""" Storages. """
+
+import gzip
+import hashlib
+import json
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.utils.functional import cached_property
+
+# ----- Constants
+GZIP_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.txt', '.json', '.html')     # сжимаемые типы
+GZIP_SUFFIX = '.gz'
+
+
+class GZipManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ Хранилище статики с хэшированными именами файлов (версионирование для долгого кэширования)
+        и предварительно сжатыми gzip-копиями, создаваемыми при выполнении collectstatic.
+        Веб-сервер отдаёт копию '<имя>.gz' при поддержке gzip клиентом (nginx: gzip_static on).
+    """
+
+    @cached_property
+    def manifest_version(self):
+        """ Версия манифеста хэшированных имён: меняется при collectstatic с изменёнными файлами. """
+        manifest = json.dumps(self.hashed_files, sort_keys=True).encode()
+        return hashlib.md5(manifest).hexdigest()[:12]
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = {}                                   # итоговые хэшированные имена (последний проход)
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names[name] = hashed_name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name, hashed_name in hashed_names.items():
+            if not name.endswith(GZIP_EXTENSIONS):
+                continue
+            # сжатие исходного и хэшированного вариантов файла
+            for path in {name, hashed_name}:
+                if self.save_gzipped(path):
+                    yield name, path + GZIP_SUFFIX, True
+
+    def save_gzipped(self, path):
+        """ Сохраняет gzip-копию файла, если она меньше оригинала. Возвращает признак сохранения. """
+        with self.open(path) as original:
+            data = original.read()
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) >= len(data):
+            return False
+        gz_path = path + GZIP_SUFFIX
+        if self.exists(gz_path):
+            self.delete(gz_path)
+        self._save(gz_path, ContentFile(compressed))
+        return True
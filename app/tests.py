@@ -1,3 +1,581 @@
-from django.test import TestCase
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, models
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from app.leaderboard import leaderboard, Leaderboard, Summary, WindowedSummary, new_boards, dump_boards, \
+    restore_boards, PAGES, CONTENT, ALL_TIME
+from app.management.commands.gc_media import get_referenced
+from app.management.commands.verify_media import verify_rows
+from app.middleware import ThresholdGZipMiddleware
+from app.storage import GZipManifestStaticFilesStorage
+from app import uploads, views
+from app.models import Page, Content, Text, Audio, Video, DeferredDeletion, LeaderboardSnapshot, Upload
+from app.service import ContentType, HASH_CHUNK_SIZE, get_hash
+
+
+class QueryPlanTests(TestCase):
+    """ Регрессионные тесты планов запросов: запросы горячих путей кода не должны переходить на полный просмотр таблиц.
+        Запросы перехватываются при выполнении кода, план - EXPLAIN QUERY PLAN (SQLite) либо EXPLAIN (MySQL).
+    """
+    rows = 200                                                  # объём таблиц, при котором полный просмотр невыгоден
+
+    @classmethod
+    def setUpTestData(cls):
+        Text.objects.bulk_create(Text(value='Текст {}'.format(i), hash=get_hash('', 'Текст {}'.format(i)))
+                                 for i in range(cls.rows))
+        Content.objects.bulk_create(Content(title='Контент {}'.format(text.id), ctype=ContentType.TEXT, text=text,
+                                            not_empty=True) for text in Text.objects.order_by('id'))
+        content_list = Content.objects.order_by('id').values_list('id', flat=True)[:3]
+        cls.page = Page.objects.create(title='страница', content_list=','.join(str(obj_id) for obj_id in content_list))
+
+    def get_full_scans(self, sql):
+        """ Возвращает строки плана запроса с полным просмотром таблиц. """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                details = [row[-1] for row in cursor.fetchall()]
+                return [detail for detail in details if detail.startswith('SCAN') and 'INDEX' not in detail]
+            if connection.vendor == 'mysql':
+                cursor.execute('EXPLAIN ' + sql)
+                columns = [column[0] for column in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                # полный просмотр, в т.ч. выбранный оптимизатором при наличии пригодного индекса
+                return [row for row in rows if row['type'] == 'ALL']
+        self.skipTest('План запроса не поддерживается для СУБД {}'.format(connection.vendor))
+
+    def assertIndexed(self, func, *args, **kwargs):
+        """ Проверка планов всех запросов выборки и изменения, выполненных кодом func. """
+        with CaptureQueriesContext(connection) as context:
+            func(*args, **kwargs)
+        queries = [query['sql'] for query in context.captured_queries
+                   if query['sql'].startswith(('SELECT', 'UPDATE', 'DELETE'))]
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertEqual(self.get_full_scans(sql), [], sql)
+
+    def test_duplicate_save(self):
+        """ Сохранение дубликата (save_type_content): поиск по хэшу, перепривязка контента, удаление дубликатов. """
+        Text.objects.bulk_create([Text(value='Текст 1', hash=get_hash('', 'Текст 1'))])    # дубликат в БД
+        self.assertIndexed(Text(value='текст 1').save)
+        self.assertEqual(Text.objects.filter(hash=get_hash('', 'Текст 1')).count(), 1)
+
+    def test_page_view(self):
+        """ Детализация страницы с подсчётом просмотров (PageModelViewSet.retrieve). """
+        url = reverse('page-detail', args=[self.page.id])
+        leaderboard.top(PAGES)                                  # однократная загрузка рейтинга вне проверки
+        for params in ({}, {'fields': 'id'}):
+            with self.subTest(params=params):
+                self.assertIndexed(self.client.get, url, params)
+
+    def test_referenced_files(self):
+        """ Проверка ссылок на файлы при очистке хранилища (gc_media). """
+        self.assertIndexed(get_referenced, ['a.mp3', 'b.mp4', 'c.srt'])
+
+
+class ReplacedFilesTests(TestCase):
+    """ Очередь отложенного удаления файлов, заменённых при сохранении медиаконтента. """
+
+    @classmethod
+    def setUpTestData(cls):
+        Video.objects.bulk_create([Video(hash='h', value='a.mp4', subtitles='a.srt')])
+
+    def save(self, obj, **kwargs):
+        """ Сохранение без хэширования файла (Video.save): сигналы pre_save/post_save отправляются. """
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Model.save(obj, **kwargs)
+
+    def test_deferred_fields(self):
+        """ Загрузка с отложенными полями файлов не обращается к ним. """
+        with self.assertNumQueries(1):
+            self.assertEqual(len(Video.objects.only('id', 'hash')), 1)
+
+    def test_replaced_file(self):
+        obj = Video.objects.get()
+        obj.subtitles = 'b.srt'
+        self.save(obj)
+        self.assertEqual(list(DeferredDeletion.objects.values_list('path', flat=True)), ['a.srt'])
+
+    def test_unchanged_files(self):
+        obj = Video.objects.only('id', 'hash').get()
+        with self.assertNumQueries(1):
+            self.save(obj, update_fields=['hash'])                  # поля файлов не сохраняются
+        self.assertFalse(DeferredDeletion.objects.exists())
+
+
+class PageApiTests(TestCase):
+    """ API страниц: ограничение полей и раскрытие связей, подсчёт просмотров при детализации. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.texts = [Text.objects.create(value='текст {}'.format(i)) for i in range(3)]
+        cls.contents = [Content.objects.create(title='контент {}'.format(i), text=text)
+                        for i, text in enumerate(cls.texts)]
+        cls.page = Page.objects.create(title='страница', content_list=','.join(str(obj.id) for obj in cls.contents))
+
+    def get_page(self, **params):
+        return self.client.get(reverse('page-detail', args=[self.page.id]), params)
+
+    def get_counters(self):
+        return [obj.counter for obj in Text.objects.order_by('id')]
+
+    def test_detail_default(self):
+        """ Детализация по умолчанию: раскрыты все связи, счётчики увеличены одним UPDATE. """
+        # страница, контент со связями (предвыборка), UPDATE счётчиков текстов
+        with self.assertNumQueries(3):
+            data = self.get_page().json()
+        self.assertEqual(data['content'][0]['text']['value'], self.texts[0].value)
+        self.assertEqual(self.get_counters(), [1, 1, 1])
+
+    def test_detail_sparse(self):
+        """ Детализация без контента: в выборке нет связанных объектов, счётчики - по id связей. """
+        with self.assertNumQueries(3):
+            data = self.get_page(fields='id,title').json()
+        self.assertEqual(set(data), {'id', 'title'})
+        self.assertEqual(self.get_counters(), [1, 1, 1])
+
+    def test_detail_content_ids(self):
+        """ Контент без раскрытия связей по типу: id связанных объектов. """
+        data = self.get_page(expand='content').json()
+        self.assertEqual([item['text'] for item in data['content']], [obj.id for obj in self.texts])
+
+    def test_repeated_content(self):
+        """ Объект по типу в нескольких элементах контента страницы учитывается каждый раз. """
+        Content.objects.filter(id=self.contents[1].id).update(text=self.texts[0])
+        self.get_page(fields='id')
+        self.assertEqual(self.get_counters(), [2, 0, 1])
+
+    def test_list_sparse(self):
+        """ Список страниц без контента: один запрос страниц (и подсчёт количества). """
+        with self.assertNumQueries(2):
+            data = self.client.get(reverse('pages-list'), {'fields': 'id,title'}).json()
+        self.assertEqual([set(item) for item in data['results']], [{'id', 'title'}])
+
+    def test_unlinked_content(self):
+        """ Контент со снятой связью (ctype='') и с удалённым объектом по типу (SET_NULL) не учитывается. """
+        self.contents[0].text = None
+        self.contents[0].save()
+        self.texts[1].delete()
+        with mock.patch.object(leaderboard, 'record') as record:
+            self.assertEqual(self.get_page().status_code, 200)
+        record.assert_called_once_with(self.page.id, [(ContentType.TEXT, self.texts[2].id)])
+
+
+class LeaderboardTests(TestCase):
+    """ Рейтинги просмотров: сводки Space-Saving, скользящие окна, общий снимок в БД и API /pages/top. """
+
+    def new_leaderboard(self):
+        board = Leaderboard()
+        self.addCleanup(lambda: board.timer and board.timer.cancel())    # без отложенного слияния после теста
+        return board
+
+    def test_summary(self):
+        summary = Summary(capacity=2)
+        for key in ('a', 'a', 'a', 'b', 'b', 'c'):
+            summary.add(key)
+        # 'c' вытесняет наименьший счётчик 'b' с наследованием его значения
+        self.assertEqual(summary.top(2), [('a', 3), ('c', 3)])
+
+    def test_windowed_summary(self):
+        summary = WindowedSummary(60, 6)
+        summary.add('old', 5, now=1000)
+        summary.add('new', 1, now=1055)
+        self.assertEqual(summary.top(2, now=1059), [('old', 5), ('new', 1)])
+        self.assertEqual(summary.top(2, now=1065), [('new', 1)])               # корзина 'old' вне окна
+
+    def test_dump_restore(self):
+        boards = new_boards()
+        boards[PAGES][ALL_TIME].add(1, 2)
+        boards[CONTENT]['hour'].add((ContentType.TEXT, 3), 4, now=time.time())
+        restored = restore_boards(json.loads(json.dumps(dump_boards(boards))))
+        self.assertEqual(restored[PAGES][ALL_TIME].top(1), [(1, 2)])
+        self.assertEqual(restored[CONTENT]['hour'].top(1), [((ContentType.TEXT, 3), 4)])
+
+    def test_persist(self):
+        """ Слияние приращений двух процессов и однократный начальный рейтинг по счётчикам в БД. """
+        text = Text.objects.create(value='текст')
+        Text.objects.filter(id=text.id).update(counter=5)
+        key = (ContentType.TEXT, text.id)
+        first, second = self.new_leaderboard(), self.new_leaderboard()
+        first.record(1, [key])
+        second.record(1, [key])
+        self.assertTrue(first.persist())
+        self.assertTrue(second.persist())
+        self.assertEqual(second.top(CONTENT), [(key, 7)])
+        self.assertEqual(self.new_leaderboard().top(PAGES), [(1, 2)])
+        self.assertEqual(LeaderboardSnapshot.objects.count(), 1)
+
+    def test_persist_error(self):
+        """ Приращения, не слитые из-за ошибки БД, сохраняются до следующего слияния. """
+        board = self.new_leaderboard()
+        board.record(1, [])
+        with mock.patch.object(LeaderboardSnapshot, 'save', side_effect=DatabaseError):
+            self.assertFalse(board.persist())
+        self.assertTrue(board.persist())
+        self.assertEqual(self.new_leaderboard().top(PAGES), [(1, 1)])
+
+    def test_top_api(self):
+        content = Content.objects.create(title='контент', text=Text.objects.create(value='текст'))
+        page = Page.objects.create(title='страница', content_list=str(content.id))
+        board = self.new_leaderboard()
+        with mock.patch('app.api.leaderboard', board):
+            for i in range(2):
+                self.client.get(reverse('page-detail', args=[page.id]))
+            self.assertEqual(self.client.get(reverse('pages-top'), {'window': 'week'}).status_code, 400)
+            for window in (ALL_TIME, 'hour'):
+                with self.subTest(window=window):
+                    data = self.client.get(reverse('pages-top'), {'window': window}).json()
+                    self.assertEqual([(item['id'], item['title'], item['views']) for item in data['pages']],
+                                     [(page.id, page.title, 2)])
+                    # рейтинг за всё время: начальный рейтинг по счётчикам не включает учтённые просмотры
+                    self.assertEqual(data['content'],
+                                     [{'ctype': ContentType.TEXT, 'id': content.text_id, 'views': 2}])
+        board.persist()
+        self.assertEqual(self.new_leaderboard().top(CONTENT), [((ContentType.TEXT, content.text_id), 2)])
+        self.assertEqual(Text.objects.get(id=content.text_id).counter, 2)
+
+
+class UploadApiTests(TestCase):
+    """ Загрузка видео частями: создание сессии, приём частей, фиксация, дубликат и истечение сессий. """
+
+    def setUp(self):
+        media_root, uploads_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.addCleanup(shutil.rmtree, uploads_dir)
+        self.settings_override = override_settings(MEDIA_ROOT=media_root, UPLOADS_DIR=uploads_dir)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.user = User.objects.create_user('user')
+        self.client.force_login(self.user)
+        self.data = os.urandom(HASH_CHUNK_SIZE * 2 + 1000)
+
+    def create(self, filename, ctype=ContentType.VIDEO, size=None):
+        response = self.client.post(reverse('upload-list'), {'ctype': ctype, 'filename': filename,
+                                                             'size': len(self.data) if size is None else size})
+        self.assertEqual(response.status_code, 201)
+        return reverse('upload-detail', args=[response.json()['id']])
+
+    def send(self, url, offset, data):
+        return self.client.patch(url, data, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def commit(self, url):
+        return self.client.post(url + 'commit/')
+
+    def test_upload(self):
+        url, middle = self.create('movie.mp4'), HASH_CHUNK_SIZE + 100
+        self.assertEqual(self.send(url, 0, self.data[:middle]).json()['offset'], middle)
+        self.assertEqual(self.send(url, 5, self.data[:10]).status_code, 409)            # неверное смещение
+        uploads.hashers.clear()                                     # следующая часть - в другом процессе
+        self.assertEqual(self.send(url, middle, self.data[middle:]).json()['offset'], len(self.data))
+
+        response = self.commit(url)
+        self.assertEqual(response.status_code, 201)
+        video = Video.objects.get()
+        self.assertEqual(response.json(), {'ctype': ContentType.VIDEO, 'id': video.id,
+                                           'hash': hashlib.md5(self.data).hexdigest()})
+        self.assertEqual(video.value.name, 'movie.mp4')
+        with video.value.open('rb') as file:
+            self.assertEqual(file.read(), self.data)
+        self.assertEqual(os.listdir(settings.UPLOADS_DIR), [])
+        self.assertEqual(self.commit(url).status_code, 404)                             # сессия удалена
+
+        # Дубликат: объект связывается с оригиналом, временный файл удаляется
+        url = self.create('copy.mp4')
+        self.send(url, 0, self.data)
+        response = self.commit(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['id'], video.id)
+        self.assertEqual(Video.objects.count(), 1)
+        self.assertEqual(os.listdir(settings.MEDIA_ROOT), ['movie.mp4'])
+        self.assertEqual(os.listdir(settings.UPLOADS_DIR), [])
+
+    def test_incomplete_commit(self):
+        url = self.create('movie.mp4')
+        self.send(url, 0, self.data[:10])
+        self.assertEqual(self.commit(url).status_code, 409)
+
+    def test_invalid_session(self):
+        """ Пустой файл и имя с элементами пути отклоняются при создании сессии, до приёма частей. """
+        for filename, size in (('movie.mp4', 0), ('../movie.mp4', 10), ('video/movie.mp4', 10)):
+            with self.subTest(filename=filename, size=size):
+                response = self.client.post(reverse('upload-list'), {'ctype': ContentType.VIDEO,
+                                                                     'filename': filename, 'size': size})
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Upload.objects.exists())
+
+    def test_unrecognized_audio(self):
+        """ Файл, не распознанный mutagen (неизвестный формат либо повреждённый заголовок), не фиксируется. """
+        for data in (self.data[:1000], b'ID3' + self.data[:1000]):
+            with self.subTest(header=data[:3]):
+                url = self.create('sound.mp3', ContentType.AUDIO, len(data))
+                self.send(url, 0, data)
+                self.assertEqual(self.commit(url).status_code, 409)
+        self.assertFalse(Audio.objects.exists())
+
+    def test_expire(self):
+        """ gc_media удаляет истёкшие сессии и старые временные файлы без сессий. """
+        expired, active = self.create('old.mp4'), self.create('new.mp4')
+        self.send(expired, 0, self.data[:10])
+        self.send(active, 0, self.data[:10])
+        Upload.objects.filter(filename='old.mp4').update(updated=timezone.now() - timedelta(days=2))
+        orphan = os.path.join(settings.UPLOADS_DIR, 'orphan')
+        open(orphan, 'wb').close()
+        os.utime(orphan, (0, 0))
+        call_command('gc_media', stdout=io.StringIO())
+        self.assertEqual(list(Upload.objects.values_list('filename', flat=True)), ['new.mp4'])
+        self.assertEqual(os.listdir(settings.UPLOADS_DIR), [str(Upload.objects.get().id)])
+
+
+class GcMediaTests(TestCase):
+    """ Очистка медиаконтента: очередь отложенного удаления и обход MEDIA_ROOT. """
+
+    def setUp(self):
+        self.media_root, uploads_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.addCleanup(shutil.rmtree, uploads_dir)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, UPLOADS_DIR=uploads_dir)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def create_file(self, name, age=7200):
+        path = os.path.join(self.media_root, name)
+        with open(path, 'wb') as file:
+            file.write(b'video')
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def gc_media(self, *args):
+        call_command('gc_media', *args, stdout=io.StringIO())
+
+    def get_files(self):
+        return sorted(os.listdir(self.media_root))
+
+    def test_queue(self):
+        """ Файл из очереди, на который снова есть ссылка, сохраняется; файл без ссылок удаляется с записью. """
+        for name in ('used.mp4', 'unused.mp4'):
+            self.create_file(name)
+            DeferredDeletion.objects.create(path=name)
+        Video.objects.bulk_create([Video(hash=hashlib.md5(b'video').hexdigest(), value='used.mp4')])
+        self.gc_media('--queue-only')
+        self.assertEqual(self.get_files(), ['used.mp4'])
+        self.assertFalse(DeferredDeletion.objects.exists())
+
+    def test_sweep(self):
+        """ Обход удаляет файлы-сироты и сохраняет файлы со ссылками по относительному и абсолютному имени. """
+        legacy = self.create_file('legacy.mp4')
+        for name in ('relative.mp4', 'orphan.mp4'):
+            self.create_file(name)
+        Video.objects.bulk_create([Video(hash=str(i), value=name) for i, name in enumerate(('relative.mp4', legacy))])
+        self.gc_media()
+        self.assertEqual(self.get_files(), ['legacy.mp4', 'relative.mp4'])
+
+    def test_dry_run(self):
+        self.create_file('orphan.mp4')
+        DeferredDeletion.objects.create(path='queued.mp4')
+        self.create_file('queued.mp4')
+        self.gc_media('--dry-run')
+        self.assertEqual(self.get_files(), ['orphan.mp4', 'queued.mp4'])
+        self.assertTrue(DeferredDeletion.objects.exists())
+
+    def test_min_age(self):
+        """ Свежие файлы (возможно, ещё не связанные с объектом) при обходе не удаляются. """
+        self.create_file('old.mp4')
+        self.create_file('fresh.mp4', age=0)
+        self.gc_media('--min-age', '3600')
+        self.assertEqual(self.get_files(), ['fresh.mp4'])
+
+
+class VerifyMediaTests(TestCase):
+    """ Проверка целостности контента: ошибки чтения файлов учитываются, проверка завершается. """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        with open(os.path.join(self.media_root, 'ok.mp4'), 'wb') as file:
+            file.write(b'video')
+        os.mkdir(os.path.join(self.media_root, 'dir.mp4'))
+        self.checkpoint = os.path.join(self.media_root, 'checkpoint.json')
+        for name in ('ok.mp4', 'missing.mp4', 'dir.mp4', '../outside.mp4'):
+            Video.objects.bulk_create([Video(hash=hashlib.md5(b'video').hexdigest(), value=name)])
+
+    def verify(self, *args):
+        output = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('verify_media', '--workers', '2', '--batch-size', '2', '--checkpoint', self.checkpoint,
+                         *args, stdout=output)
+        self.assertFalse(os.path.exists(self.checkpoint))
+        return output.getvalue()
+
+    def test_errors(self):
+        output = self.verify()
+        self.assertIn('Video: проверено 4, ошибок 3', output)
+        self.assertIn('Video [missing]: 1', output)
+        self.assertIn('Video [unreadable]: 2', output)                  # каталог и имя вне MEDIA_ROOT
+
+    def test_resume(self):
+        with open(self.checkpoint, 'w', encoding='utf-8') as file:
+            json.dump({'last_id': {'Video': Video.objects.get(value='ok.mp4').id}, 'errors': {}}, file)
+        self.assertIn('Video: проверено 3, ошибок 3', self.verify('--resume'))
+
+    def test_slow_file(self):
+        """ Медленная проверка не задерживает следующие: результаты - в порядке строк. """
+        released = threading.Event()
+
+        def verify(row, throttle):
+            if row[0] == 0:
+                return released.wait(5) or 'timeout'           # ожидание проверки последней строки
+            if row[0] == 9:
+                released.set()
+            return None
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(verify_rows(executor, verify, [(i, '', '') for i in range(10)], None, 2, 10))
+        self.assertEqual(results, [(0, True)] + [(i, None) for i in range(1, 10)])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class HomePageTests(TestCase):
+    """ Стартовая страница: маршрут '/' и кэшируемые фрагменты шаблона. """
+
+    def setUp(self):
+        cache.clear()
+
+    def create_page(self, title='страница'):
+        content = Content.objects.create(title='контент', text=Text.objects.create(value=title))
+        return Page.objects.create(title=title, content_list=str(content.id))
+
+    def test_home(self):
+        self.assertTemplateUsed(self.client.get('/'), 'app/index.html')
+
+    def test_version(self):
+        """ Сохранение и удаление страницы меняют версию кэша стартовой страницы. """
+        version = views.get_home_version()
+        page = self.create_page()
+        self.assertNotEqual(views.get_home_version(), version)
+        version = views.get_home_version()
+        page.delete()
+        self.assertNotEqual(views.get_home_version(), version)
+
+    def test_cached_fragments(self):
+        """ Повторный запрос использует кэшированные фрагменты до смены версии. """
+        self.client.get('/')
+        api_list = [dict(views.API_LIST[0], info='Изменённое описание')]
+        with mock.patch('app.views.API_LIST', api_list):
+            self.assertNotContains(self.client.get('/'), 'Изменённое описание')
+            self.create_page()
+            self.assertContains(self.client.get('/'), 'Изменённое описание')
+
+    def test_random_page(self):
+        """ Ссылка на случайную страницу формируется в каждом запросе, в том числе при устаревшем диапазоне id. """
+        pages = [self.create_page('страница {}'.format(i)) for i in range(2)]
+        for page in pages:
+            with self.subTest(page=page.id), mock.patch('random.randint', return_value=page.id):
+                self.assertContains(self.client.get('/'), 'href="/page/{}"'.format(page.id))
+        # диапазон id закэширован другим процессом до удаления последней страницы
+        cache.set(views.HOME_BOUNDS_KEY.format(views.get_home_version()),
+                  {'min_id': pages[0].id, 'max_id': pages[1].id + 1})
+        with mock.patch('random.randint', return_value=pages[1].id + 1):
+            self.assertContains(self.client.get('/'), 'href="/page/{}"'.format(pages[0].id))
+
+    def test_static_version(self):
+        """ Фрагменты со ссылками на статику обновляются при смене версии статических файлов. """
+        for static_url in ('/static-1/', '/static-2/'):
+            with self.subTest(static_url=static_url), self.settings(STATIC_URL=static_url):
+                self.assertContains(self.client.get('/'), static_url + 'app/content/site.css')
+
+    def test_manifest_version(self):
+        versions = set()
+        for hashed_name in ('app/content/site.1.css', 'app/content/site.2.css'):
+            storage = GZipManifestStaticFilesStorage()
+            storage.hashed_files = {'app/content/site.css': hashed_name}
+            versions.add(storage.manifest_version)
+        self.assertEqual(len(versions), 2)
+
+
+@override_settings(GZIP_MIN_LENGTH=100)
+class GZipMiddlewareTests(SimpleTestCase):
+    """ Сжатие ответов: только JSON-ответы API от порогового размера. """
+
+    def process(self, response, encoding='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=encoding)
+        return ThresholdGZipMiddleware(lambda request: response)(request)
+
+    def test_json_compressed(self):
+        response = self.process(JsonResponse({'value': 'x' * 500}))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_short_json_not_compressed(self):
+        self.assertFalse(self.process(JsonResponse({'value': 'x'})).has_header('Content-Encoding'))
+
+    def test_not_accepted(self):
+        self.assertFalse(self.process(JsonResponse({'value': 'x' * 500}), encoding='').has_header('Content-Encoding'))
+
+    def test_html_not_compressed(self):
+        """ HTML со CSRF-токеном не сжимается (BREACH). """
+        response = self.process(HttpResponse('<input name="csrfmiddlewaretoken">' * 50))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class CollectStaticTests(SimpleTestCase):
+    """ collectstatic с GZipManifestStaticFilesStorage: хэшированные имена и gzip-копии сжимаемых файлов. """
+
+    def setUp(self):
+        source, self.static_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        self.addCleanup(shutil.rmtree, self.static_root)
+        self.files = {
+            'site.css': b'body { margin: 0; }\n' * 100,
+            'tiny.css': b'a{}',                                 # gzip-копия не меньше оригинала
+            'logo.png': b'\x89PNG' * 100,                       # несжимаемый тип
+        }
+        for name, data in self.files.items():
+            with open(os.path.join(source, name), 'wb') as file:
+                file.write(data)
+        self.settings_override = override_settings(
+            STATIC_ROOT=self.static_root, STATICFILES_DIRS=[source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATICFILES_STORAGE='app.storage.GZipManifestStaticFilesStorage')
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_collectstatic(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(self.static_root, 'staticfiles.json'), encoding='utf-8') as file:
+            hashed_names = json.load(file)['paths']
+        self.assertEqual(set(hashed_names), set(self.files))
+        for name, data in self.files.items():
+            self.assertNotEqual(hashed_names[name], name)
+            for path in (name, hashed_names[name]):
+                with self.subTest(path=path):
+                    with open(os.path.join(self.static_root, path), 'rb') as file:
+                        self.assertEqual(file.read(), data)
+                    gz_path = os.path.join(self.static_root, path + '.gz')
+                    if name != 'site.css':
+                        self.assertFalse(os.path.exists(gz_path))
+                        continue
+                    with open(gz_path, 'rb') as file:
+                        self.assertEqual(gzip.decompress(file.read()), data)
@@ -0,0 +1,133 @@
+""" Возобновляемая загрузка файлов медиаконтента частями.
+
+    Части дописываются во временный файл сессии Upload по смещению offset и хэшируются по мере поступления:
+    в памяти находится не более HASH_CHUNK_SIZE байт части, а при фиксации загрузки файл не хэшируется повторно.
+
+    Состояние MD5 не сериализуется и хранится только в памяти процесса (не более HASHERS_LIMIT сессий).
+    Части одной загрузки должны направляться в один процесс (sticky-маршрутизация по id загрузки):
+    в другом процессе, после перезапуска либо вытеснения состояние восстанавливается хэшированием всей
+    уже принятой части файла, и без sticky-маршрутизации объём чтения растёт квадратично от числа частей.
+    Незавершённые сессии и временные файлы без сессий удаляет команда gc_media по истечении UPLOAD_EXPIRE.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from threading import Lock
+
+import mutagen
+
+from django.core.files import File
+from django.db import transaction
+
+from app.models import Audio, Video, Upload
+from app.service import ContentType, HASH_CHUNK_SIZE
+
+# ----- Constants
+UPLOAD_MODELS = {ContentType.AUDIO: Audio, ContentType.VIDEO: Video}
+HASHERS_LIMIT = 1000                                # максимум состояний MD5 в памяти процесса
+
+hashers = OrderedDict()                             # id загрузки -> (offset, состояние MD5), по давности обращения
+hashers_lock = Lock()
+
+
+class UploadError(Exception):
+    """ Ошибка загрузки частями. """
+
+
+class UploadedTempFile(File):
+    """ Временный файл загрузки: хранилище перемещает его в MEDIA_ROOT без копирования. """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def get_hasher(upload):
+    """ Возвращает состояние MD5 принятой части файла загрузки (копию из памяти процесса либо восстановленное).
+        Сохранённое состояние не изменяется: при ошибке записи части оно остаётся действительным.
+    """
+    with hashers_lock:
+        offset, hasher = hashers.get(upload.id, (None, None))
+    if offset == upload.offset:
+        return hasher.copy()
+    hasher, remaining = hashlib.md5(), upload.offset
+    if remaining:
+        with open(upload.path, 'rb') as file:
+            while remaining:
+                data = file.read(min(HASH_CHUNK_SIZE, remaining))
+                if not data:
+                    raise UploadError('Временный файл загрузки короче принятого смещения.')
+                hasher.update(data)
+                remaining -= len(data)
+    return hasher
+
+
+def set_hasher(upload, hasher):
+    """ Сохраняет состояние MD5 загрузки с вытеснением давно не использованных состояний. """
+    with hashers_lock:
+        hashers[upload.id] = (upload.offset, hasher)
+        hashers.move_to_end(upload.id)
+        while len(hashers) > HASHERS_LIMIT:
+            hashers.popitem(last=False)
+
+
+def append_chunk(upload_id, offset, stream):
+    """ Дописывает часть файла из потока запроса с позиции offset. Возвращает обновлённую сессию загрузки. """
+    with transaction.atomic():
+        upload = Upload.objects.select_for_update().get(id=upload_id)   # последовательная запись частей
+        if offset != upload.offset:
+            raise UploadError('Ожидается смещение {}.'.format(upload.offset))
+        hasher = get_hasher(upload)
+        os.makedirs(os.path.dirname(upload.path), exist_ok=True)
+        with open(upload.path, 'r+b' if upload.offset else 'wb') as file:
+            file.seek(upload.offset)
+            file.truncate()                                     # отбрасывание незафиксированного хвоста
+            data = stream.read(HASH_CHUNK_SIZE)
+            while data:
+                upload.offset += len(data)
+                if upload.offset > upload.size:
+                    raise UploadError('Превышен заявленный размер файла {}.'.format(upload.size))
+                file.write(data)
+                hasher.update(data)
+                data = stream.read(HASH_CHUNK_SIZE)
+        upload.save(update_fields=['offset', 'updated'])
+    set_hasher(upload, hasher)
+    return upload
+
+
+def check_audio(value):
+    """ Проверяет, что файл распознаётся mutagen (при сохранении Audio по нему определяется битрейт). """
+    try:
+        audio = mutagen.File(value)
+    except mutagen.MutagenError:
+        audio = None
+    finally:
+        value.seek(0)
+    if audio is None:
+        raise UploadError('Файл не распознан как аудио.')
+
+
+def commit_upload(upload, **fields):
+    """ Создаёт объект медиаконтента из полностью принятого файла с хэшем, вычисленным при загрузке.
+        При наличии дубликата (по хэшу) временный файл удаляется, объект связывается с файлом оригинала.
+    """
+    if upload.offset != upload.size:
+        raise UploadError('Файл принят не полностью: {} из {} байт.'.format(upload.offset, upload.size))
+    obj = UPLOAD_MODELS[upload.ctype](**fields)
+    obj.precomputed_hash = get_hasher(upload).hexdigest()
+    with open(upload.path, 'rb') as file:
+        obj.value = UploadedTempFile(file, name=upload.filename)
+        if upload.ctype == ContentType.AUDIO:
+            check_audio(obj.value)
+        obj.save()
+    discard_upload(upload)
+    return obj
+
+
+def discard_upload(upload):
+    """ Удаляет сессию загрузки, её временный файл и состояние хэширования. """
+    with hashers_lock:
+        hashers.pop(upload.id, None)
+    if os.path.exists(upload.path):
+        os.remove(upload.path)
+    upload.delete()
@@ -9,8 +9,9 @@ router = routers.DefaultRouter()
 router.register(r'pages', api.PageModelViewSet, 'pages')
 router.register(r'page', api.PageModelViewSet, 'page')
 router.register(r'page', api.PageModelViewSet, 'page')
+router.register(r'uploads', api.UploadViewSet, 'upload')
 
 urlpatterns = [
+    path('', views.HomePageView.as_view(), name='home'),  # стартовая страница (до корня API роутера)
     path('', include(router.urls)),
-    path('', views.HomePageView.as_view(), name='home'),  # стартовая страница
 ]
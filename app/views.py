@@ -1,37 +1,81 @@
 """ View Controllers. """
 
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Min
 from django.views.generic.base import TemplateView
 
 from app.models import Page
 
+# ----- Constants
+HOME_VERSION_KEY = 'home:version'                   # версия кэша стартовой страницы (меняется при изменении страниц)
+HOME_BOUNDS_KEY = 'home:bounds:{}'                  # диапазон id страниц для выбора случайной страницы
+# Статическая часть списка API-вызовов (кэшируется во фрагменте шаблона)
+API_LIST = [
+    {   # список всех страниц
+        'method': 'GET', 'url': '/pages', 'info': 'Список всех страниц',
+        'comment': '', 'json': 'paginated pages list'
+    },
+]
+
+
+def get_home_version():
+    """ Возвращает текущую версию кэша стартовой страницы (часть ключей кэшируемых фрагментов). """
+    return cache.get_or_set(HOME_VERSION_KEY, 1, None)
+
+
+def invalidate_home():
+    """ Инвалидация кэша стартовой страницы сменой версии ключей. """
+    try:
+        cache.incr(HOME_VERSION_KEY)
+    except ValueError:                                          # версия ещё не установлена
+        cache.set(HOME_VERSION_KEY, 1, None)
+
+
+def get_random_page(version):
+    """ Возвращает случайную страницу (только id) по индексу первичного ключа без сортировки ORDER BY RAND. """
+    key = HOME_BOUNDS_KEY.format(version)
+    bounds = cache.get(key)
+    if bounds is None:
+        bounds = Page.objects.aggregate(min_id=Min('id'), max_id=Max('id'))
+        cache.set(key, bounds, settings.HOME_CACHE_TIMEOUT)          # ограничение устаревания в других процессах
+    if bounds['min_id'] is None:
+        return None
+    pivot = random.randint(bounds['min_id'], bounds['max_id'])
+    pages = Page.objects.only('id').order_by('id')
+    # устаревший диапазон (страницы удалены в другом процессе) - переход к первой странице
+    return pages.filter(id__gte=pivot).first() or pages.first()
+
 
 # ----- Class based views
 
 class HomePageView(TemplateView):
-    """ Стартовая страница приложения. """
+    """ Стартовая страница приложения.
+        Статические части шаблона кэшируются фрагментами с версией home_version в ключе (фрагменты макета
+        со ссылками на статику - с версией static_version), в каждом запросе формируются только ссылка
+        на случайную страницу и блок авторизации.
+    """
     template_name = "app/index.html"
 
     def get_context_data(self, **kwargs):
         # инициализация контекста из базового класса
         context = super().get_context_data(**kwargs)
         # новый фунционал
-        random_page = Page.objects.filter().only('id').order_by('?').first()
+        home_version = get_home_version()
+        random_page = get_random_page(home_version)
         random_page_msg = '(' + (('random page <id> = ' + str(random_page.id)) if random_page
                                  else 'no pages in database') + ')'
         url_details = '/page/' + (str(random_page.id) if random_page else '<id>')
-        api_list = [
-            {   # список всех страниц
-                'method': 'GET', 'url': '/pages', 'info': 'Список всех страниц',
-                'comment': '', 'json': 'paginated pages list'
-            },
-            {   # детализация страницы
+        context.update({
+            'home_version': home_version,
+            'random_page': random_page,
+            'api_list': API_LIST,
+            'api_details': {    # детализация страницы
                 'method': 'GET', 'url': url_details, 'info': 'Детальная информация о странице',
                 'comment': random_page_msg, 'json': 'page details'
             },
-        ]
-        context.update({
-            'random_page': random_page,
-            'api_list': api_list,
             'title': 'Pages',
             'year': '2021',
         })
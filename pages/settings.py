@@ -20,6 +20,8 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 STATIC_URL = '/static/'
 STATIC_ROOT = posixpath.join(*(BASE_DIR.split(os.path.sep) + ['static']))
+# Хэшированные имена файлов статики и gzip-копии при collectstatic (для долгого кэширования веб-сервером)
+STATICFILES_STORAGE = 'app.storage.GZipManifestStaticFilesStorage'
 
 MEDIA_DIR = 'media'
 MEDIA_URL = '/' + MEDIA_DIR + '/'
@@ -28,6 +30,9 @@ MEDIA_ROOT = os.path.join(BASE_DIR, MEDIA_DIR) + os.path.sep
 SUBTITLES_DIR = 'subtitles'
 SUBTITLES = os.path.join(BASE_DIR, MEDIA_DIR, SUBTITLES_DIR) + os.path.sep          # '.../media/subtitles/'
 
+UPLOADS_DIR = os.path.join(BASE_DIR, 'uploads')                                    # загрузки частями (вне MEDIA_ROOT)
+UPLOAD_EXPIRE = 86400                                                               # срок незавершённой загрузки, сек
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
@@ -62,6 +67,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # сжатие ответов; при подключении кэша ответов UpdateCacheMiddleware размещается выше - в кэш попадают сжатые байты
+    'app.middleware.ThresholdGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,6 +77,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Сжатие ответов
+GZIP_MIN_LENGTH = 1024                                                              # порог сжатия, байт
+
 ROOT_URLCONF = 'pages.urls'
 
 TEMPLATES = [
@@ -85,6 +95,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 # added
                 'django.template.context_processors.media',                 # доступ к MEDIA_URL в шаблоне
+                'app.context_processors.static_version',                    # версия статики в ключах кэша шаблонов
             ],
         },
     },
@@ -115,6 +126,26 @@ DATABASES = {
 }
 '''
 
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+# LocMemCache - только для разработки (один процесс). В production нужен общий для всех процессов кэш:
+# иначе смена версии стартовой страницы (invalidate_home) видна лишь процессу, изменившему страницы,
+# и остальные процессы до HOME_CACHE_TIMEOUT отдают устаревшие фрагменты.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+'''
+    'default': {
+        # memcached
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': '127.0.0.1:11211',
+    },
+'''
+HOME_CACHE_TIMEOUT = 300                                                            # данные стартовой страницы, сек
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 